@@ -0,0 +1,73 @@
+"""
+Numba kernels for the Chandelier Exit scanner.
+
+The signature is given explicitly so the kernel is compiled (or loaded
+from the on-disk cache in __pycache__) at import time rather than on the
+first call.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit, types
+
+    # pandas hands out read-only views of its columns (copy-on-write)
+    _F8_IN = types.Array(types.float64, 1, "A", readonly=True)
+    CHANDELIER_SIG = types.Tuple((types.float64, types.float64, types.int64, types.int64))(
+        _F8_IN, _F8_IN, _F8_IN, _F8_IN, _F8_IN, types.int64, types.float64)
+except ImportError:
+    # numba is optional — fall back to running the kernel as plain Python
+    CHANDELIER_SIG = None
+
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+@njit(CHANDELIER_SIG, cache=True, fastmath=True)
+def chandelier_loop(high, low, close, highest, lowest, atr_period, atr_mult):
+    # Only the last bar is consumed, so the recurrence state is kept in
+    # scalars — returns (long_stop, short_stop, dir, prev dir) for that bar
+    n = len(close)
+    if n <= atr_period:
+        return np.nan, np.nan, 1, 1
+
+    # True Range and Wilder's ATR (ewm with alpha = 1/period, adjust=False)
+    # are carried as running scalars, without materialising either series
+    alpha = 1.0 / atr_period
+    atr   = high[0] - low[0]
+    for i in range(1, atr_period + 1):
+        tr  = max(high[i] - low[i], abs(high[i] - close[i-1]), abs(low[i] - close[i-1]))
+        atr = (1.0 - alpha) * atr + alpha * tr
+
+    # First bar has no previous stops — peel it so the loop needs no NaN checks
+    i = atr_period
+    long_stop  = highest[i] - atr_mult * atr
+    short_stop = lowest[i]  + atr_mult * atr
+    up = close[i] > short_stop
+    dn = close[i] < long_stop
+    d  = up - dn * (1 - up)
+    dir_prev  = 1
+    direction = d + (d == 0) * dir_prev
+
+    for i in range(atr_period + 1, n):
+        tr  = max(high[i] - low[i], abs(high[i] - close[i-1]), abs(low[i] - close[i-1]))
+        atr = (1.0 - alpha) * atr + alpha * tr
+
+        # Branchless form of the if/elif/else against the previous stops:
+        # up wins when both hold, neither keeps the previous direction
+        up = close[i] > short_stop
+        dn = close[i] < long_stop
+        d  = up - dn * (1 - up)
+        dir_prev  = direction
+        direction = d + (d == 0) * dir_prev
+
+        ls     = highest[i] - atr_mult * atr
+        keep_l = close[i-1] > long_stop
+        long_stop = max(ls, long_stop) * keep_l + ls * (1 - keep_l)
+
+        ss     = lowest[i] + atr_mult * atr
+        keep_s = close[i-1] < short_stop
+        short_stop = min(ss, short_stop) * keep_s + ss * (1 - keep_s)
+
+    return long_stop, short_stop, direction, dir_prev
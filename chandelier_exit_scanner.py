@@ -6,10 +6,12 @@ Alerts    : Telegram
 """
 
 import os
-import pandas as pd
-import numpy as np
-import requests
 from datetime import datetime
+from pathlib import Path
+
+# pandas/numpy/requests and the numba kernels are imported inside the
+# functions that use them, so a run that aborts on missing secrets exits
+# without paying for those imports
 
 # ── Config from GitHub Secrets ──────────────────
 TELEGRAM_TOKEN = os.environ.get("TELEGRAM_TOKEN", "")
@@ -23,70 +25,123 @@ ATR_PERIOD    = 1
 ATR_MULT      = 2.0
 USE_CLOSE     = True
 AWAIT_CONFIRM = True
-
-# ── ATR ─────────────────────────────────────────
-def compute_atr(df, period):
-    close_prev = df['Close'].shift(1)
-    tr = pd.concat([
-        df['High'] - df['Low'],
-        (df['High'] - close_prev).abs(),
-        (df['Low']  - close_prev).abs()
-    ], axis=1).max(axis=1)
-    return tr.ewm(alpha=1/period, adjust=False).mean()
+LAST_BAR_FILE = Path("/tmp/chandelier_last_bar")
+
+# Kraken OHLC row layout — parsed straight into a NumPy structured array
+KRAKEN_OHLC_DTYPE = [("Time", "i8"), ("Open", "f8"), ("High", "f8"), ("Low", "f8"),
+                     ("Close", "f8"), ("VWAP", "f8"), ("Volume", "f8"), ("Count", "i8")]
+
+# ── HTTP ─────────────────────────────────────────
+# One keep-alive session shared by the Kraken and Telegram calls
+_SESSION = None
+
+def get_session():
+    global _SESSION
+    if _SESSION is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        _SESSION = requests.Session()
+        _SESSION.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=4))
+    return _SESSION
+
+# ── Messages ─────────────────────────────────────
+# Config fields are filled in once here; only the per-bar values are
+# left as str.format() fields
+SCAN_BANNER = f"Scanning {DISPLAY_NAME} on {TIMEFRAME_STR}..."
+
+BUY_TEMPLATE = (
+    "🟢 <b>BUY Signal — Chandelier Exit</b>\n"
+    "━━━━━━━━━━━━━━━━━\n"
+    f"📌 Symbol    : <b>{DISPLAY_NAME}</b>\n"
+    f"⏱ Timeframe : <b>{TIMEFRAME_STR}</b>\n"
+    f"⚙️ ATR        : Period={ATR_PERIOD} × Mult={ATR_MULT}\n"
+    "💰 Price     : <b>${price:,.2f}</b>\n"
+    "🛡 Long Stop : <b>${stop:,.2f}</b>\n"
+    "🕐 Bar Close : {bar_time} UTC\n"
+    "━━━━━━━━━━━━━━━━━"
+)
+
+SELL_TEMPLATE = (
+    "🔴 <b>SELL Signal — Chandelier Exit</b>\n"
+    "━━━━━━━━━━━━━━━━━\n"
+    f"📌 Symbol    : <b>{DISPLAY_NAME}</b>\n"
+    f"⏱ Timeframe : <b>{TIMEFRAME_STR}</b>\n"
+    f"⚙️ ATR        : Period={ATR_PERIOD} × Mult={ATR_MULT}\n"
+    "💰 Price     : <b>${price:,.2f}</b>\n"
+    "🛡 Short Stop: <b>${stop:,.2f}</b>\n"
+    "🕐 Bar Close : {bar_time} UTC\n"
+    "━━━━━━━━━━━━━━━━━"
+)
+
+NO_SIGNAL_TEMPLATE = (
+    "🔍 <b>Scanner Active — No Signal</b>\n"
+    "━━━━━━━━━━━━━━━━━\n"
+    f"📌 Symbol    : <b>{DISPLAY_NAME}</b>\n"
+    f"⏱ Timeframe : <b>{TIMEFRAME_STR}</b>\n"
+    "📊 Trend     : {trend}\n"
+    "💰 Price     : <b>${price:,.2f}</b>\n"
+    "🕐 Checked   : {bar_time} UTC\n"
+    "━━━━━━━━━━━━━━━━━\n"
+    "✅ Alerts are working! You will be\n"
+    "notified on BUY/SELL signals only."
+)
 
 # ── Chandelier Exit ──────────────────────────────
 def chandelier_exit(df):
-    atr     = ATR_MULT * compute_atr(df, ATR_PERIOD)
-    highest = df['Close'].rolling(ATR_PERIOD).max() if USE_CLOSE else df['High'].rolling(ATR_PERIOD).max()
-    lowest  = df['Close'].rolling(ATR_PERIOD).min() if USE_CLOSE else df['Low'].rolling(ATR_PERIOD).min()
-
-    n          = len(df)
-    long_stop  = np.full(n, np.nan)
-    short_stop = np.full(n, np.nan)
-    direction  = np.ones(n, dtype=int)
-
-    for i in range(ATR_PERIOD, n):
-        ls      = highest.iloc[i] - atr.iloc[i]
-        ls_prev = long_stop[i-1]  if not np.isnan(long_stop[i-1])  else ls
-        long_stop[i] = max(ls, ls_prev) if df['Close'].iloc[i-1] > ls_prev else ls
-
-        ss      = lowest.iloc[i] + atr.iloc[i]
-        ss_prev = short_stop[i-1] if not np.isnan(short_stop[i-1]) else ss
-        short_stop[i] = min(ss, ss_prev) if df['Close'].iloc[i-1] < ss_prev else ss
-
-        ss2 = short_stop[i-1] if not np.isnan(short_stop[i-1]) else ss
-        ls2 = long_stop[i-1]  if not np.isnan(long_stop[i-1])  else ls
-        if   df['Close'].iloc[i] > ss2: direction[i] = 1
-        elif df['Close'].iloc[i] < ls2: direction[i] = -1
-        else:                           direction[i] = direction[i-1]
-
-    df = df.copy()
-    df['longStop']  = long_stop
-    df['shortStop'] = short_stop
-    df['dir']       = direction
-    df['dir_prev']  = pd.Series(direction).shift(1).fillna(1).astype(int).values
-    df['buySignal']  = (df['dir'] == 1)  & (df['dir_prev'] == -1)
-    df['sellSignal'] = (df['dir'] == -1) & (df['dir_prev'] == 1)
-    return df
+    import numpy as np
+    from _kernels import chandelier_loop
+
+    if ATR_PERIOD == 1:
+        # A 1-bar rolling max/min is the series itself
+        highest = df['Close'] if USE_CLOSE else df['High']
+        lowest  = df['Close'] if USE_CLOSE else df['Low']
+    else:
+        highest = df['Close'].rolling(ATR_PERIOD).max() if USE_CLOSE else df['High'].rolling(ATR_PERIOD).max()
+        lowest  = df['Close'].rolling(ATR_PERIOD).min() if USE_CLOSE else df['Low'].rolling(ATR_PERIOD).min()
+
+    high  = df['High'].to_numpy(dtype=np.float64, copy=False)
+    low   = df['Low'].to_numpy(dtype=np.float64, copy=False)
+    close = df['Close'].to_numpy(dtype=np.float64, copy=False)
+    hi    = highest.to_numpy(dtype=np.float64, copy=False)
+    lo    = lowest.to_numpy(dtype=np.float64, copy=False)
+
+    long_stop, short_stop, direction, dir_prev = chandelier_loop(
+        high, low, close, hi, lo, ATR_PERIOD, ATR_MULT)
+
+    # Only the last bar of df is evaluated
+    return {
+        'Close':      close[-1],
+        'longStop':   long_stop,
+        'shortStop':  short_stop,
+        'dir':        direction,
+        'buySignal':  direction == 1  and dir_prev == -1,
+        'sellSignal': direction == -1 and dir_prev == 1,
+    }
 
 # ── Kraken Data ──────────────────────────────────
 def fetch_data():
+    import numpy as np
+    import pandas as pd
+    try:
+        from orjson import loads as json_loads
+    except ImportError:
+        # orjson is optional — the stdlib decoder also accepts raw bytes
+        from json import loads as json_loads
+
     try:
-        resp = requests.get("https://api.kraken.com/0/public/OHLC",
-                            params={"pair": SYMBOL, "interval": TIMEFRAME_MIN},
-                            timeout=15)
-        data = resp.json()
+        resp = get_session().get("https://api.kraken.com/0/public/OHLC",
+                                 params={"pair": SYMBOL, "interval": TIMEFRAME_MIN},
+                                 timeout=15)
+        data = json_loads(resp.content)
         if data.get("error"):
             print(f"Kraken error: {data['error']}")
             return None
         key = [k for k in data["result"] if k != "last"][0]
         raw = data["result"][key]
-        df  = pd.DataFrame(raw, columns=["Time","Open","High","Low","Close","VWAP","Volume","Count"])
-        df["Time"] = pd.to_datetime(df["Time"].astype(int), unit="s")
-        df.set_index("Time", inplace=True)
-        for col in ["Open","High","Low","Close","Volume"]:
-            df[col] = df[col].astype(float)
-        return df[["Open","High","Low","Close","Volume"]]
+        rec   = np.fromiter(map(tuple, raw), dtype=KRAKEN_OHLC_DTYPE, count=len(raw))
+        index = pd.DatetimeIndex(rec["Time"].astype("datetime64[s]"), name="Time")
+        return pd.DataFrame({col: rec[col] for col in ["Open","High","Low","Close","Volume"]},
+                            index=index)
     except Exception as e:
         print(f"Fetch error: {e}")
         return None
@@ -94,22 +149,23 @@ def fetch_data():
 # ── Telegram ─────────────────────────────────────
 def send_telegram(msg):
     try:
-        r = requests.post(
+        r = get_session().post(
             f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage",
             json={"chat_id": CHAT_ID, "text": msg, "parse_mode": "HTML"},
             timeout=10
         )
         if r.status_code == 200:
             print("  📱 Telegram sent!")
-        else:
-            print(f"  ❌ Telegram error: {r.text}")
+            return True
+        print(f"  ❌ Telegram error: {r.text}")
     except Exception as e:
         print(f"  ❌ Telegram exception: {e}")
+    return False
 
 # ── Main ─────────────────────────────────────────
 def main():
     now = datetime.now().strftime("%Y-%m-%d %H:%M")
-    print(f"[{now} UTC] Scanning {DISPLAY_NAME} on {TIMEFRAME_STR}...")
+    print(f"[{now} UTC] {SCAN_BANNER}")
 
     if not TELEGRAM_TOKEN or not CHAT_ID:
         print("❌ TELEGRAM_TOKEN or CHAT_ID missing!")
@@ -120,10 +176,16 @@ def main():
         send_telegram("⚠️ <b>Scanner Error</b>\nFailed to fetch data from Kraken.")
         return
 
-    result   = chandelier_exit(df)
-    idx      = -2 if AWAIT_CONFIRM else -1
-    row      = result.iloc[idx]
-    bar_time = result.index[idx]
+    bars     = df.iloc[:-1] if AWAIT_CONFIRM else df
+    bar_time = bars.index[-1]
+
+    # Only closed bars are evaluated, so if the last one was already
+    # handled by a previous run the signal cannot have changed
+    if AWAIT_CONFIRM and LAST_BAR_FILE.exists() and LAST_BAR_FILE.read_text() == str(bar_time):
+        print(f"  No new bar since {bar_time} UTC — skipping.")
+        return
+
+    row      = chandelier_exit(bars)
     price    = round(row['Close'], 2)
     trend    = "📈 Bullish" if row['dir'] == 1 else "📉 Bearish"
 
@@ -132,49 +194,22 @@ def main():
 
     if row['buySignal']:
         stop = round(row['longStop'], 2)
-        send_telegram(
-            f"🟢 <b>BUY Signal — Chandelier Exit</b>\n"
-            f"━━━━━━━━━━━━━━━━━\n"
-            f"📌 Symbol    : <b>{DISPLAY_NAME}</b>\n"
-            f"⏱ Timeframe : <b>{TIMEFRAME_STR}</b>\n"
-            f"⚙️ ATR        : Period={ATR_PERIOD} × Mult={ATR_MULT}\n"
-            f"💰 Price     : <b>${price:,.2f}</b>\n"
-            f"🛡 Long Stop : <b>${stop:,.2f}</b>\n"
-            f"🕐 Bar Close : {bar_time} UTC\n"
-            f"━━━━━━━━━━━━━━━━━"
-        )
+        sent = send_telegram(BUY_TEMPLATE.format(price=price, stop=stop, bar_time=bar_time))
 
     elif row['sellSignal']:
         stop = round(row['shortStop'], 2)
-        send_telegram(
-            f"🔴 <b>SELL Signal — Chandelier Exit</b>\n"
-            f"━━━━━━━━━━━━━━━━━\n"
-            f"📌 Symbol    : <b>{DISPLAY_NAME}</b>\n"
-            f"⏱ Timeframe : <b>{TIMEFRAME_STR}</b>\n"
-            f"⚙️ ATR        : Period={ATR_PERIOD} × Mult={ATR_MULT}\n"
-            f"💰 Price     : <b>${price:,.2f}</b>\n"
-            f"🛡 Short Stop: <b>${stop:,.2f}</b>\n"
-            f"🕐 Bar Close : {bar_time} UTC\n"
-            f"━━━━━━━━━━━━━━━━━"
-        )
+        sent = send_telegram(SELL_TEMPLATE.format(price=price, stop=stop, bar_time=bar_time))
 
     else:
         # TEMPORARY TEST MESSAGE — confirms Telegram is working
         # Remove the send_telegram() call below once you confirm alerts work
-        send_telegram(
-            f"🔍 <b>Scanner Active — No Signal</b>\n"
-            f"━━━━━━━━━━━━━━━━━\n"
-            f"📌 Symbol    : <b>{DISPLAY_NAME}</b>\n"
-            f"⏱ Timeframe : <b>{TIMEFRAME_STR}</b>\n"
-            f"📊 Trend     : {trend}\n"
-            f"💰 Price     : <b>${price:,.2f}</b>\n"
-            f"🕐 Checked   : {bar_time} UTC\n"
-            f"━━━━━━━━━━━━━━━━━\n"
-            f"✅ Alerts are working! You will be\n"
-            f"notified on BUY/SELL signals only."
-        )
+        sent = send_telegram(NO_SIGNAL_TEMPLATE.format(trend=trend, price=price, bar_time=bar_time))
         print("  No signal — test Telegram sent.")
 
+    # Mark the bar as handled only once its alert went out, so a failed
+    # send is retried on the next run
+    if AWAIT_CONFIRM and sent:
+        LAST_BAR_FILE.write_text(str(bar_time))
     print("✅ Done.")
 
 if __name__ == "__main__":